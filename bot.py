@@ -1,63 +1,285 @@
 import asyncio
 import csv
-from pyppeteer import launch
-from datetime import datetime
-from rich.table import Table
-from rich.console import Console
-from rich import box
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache, partial
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from importlib.util import find_spec
+from pathlib import Path
+from urllib.parse import unquote, urlparse
 
-console = Console()
+# Playwright, Rich and httpx are imported where they're used, so importing this
+# module for load_accounts/load_proxies doesn't pull in the browser or UI stacks
+__all__ = ["main", "load_accounts", "load_proxies"]
 
-# Load accounts from CSV
-def load_accounts(filename="accounts.csv"):
-    accounts = []
+# Optional JSON endpoint for points; when set (and httpx is installed) Chromium is never started
+POINTS_API_URL = os.environ.get("HEDNET_POINTS_API")
+HAS_HTTPX = find_spec("httpx") is not None
+USE_API = bool(POINTS_API_URL) and HAS_HTTPX
+HAS_H2 = find_spec("h2") is not None
+API_CLIENTS = {}
+# API polls are plain HTTP requests, so they get their own, wider bound than Chromium pages
+API_MAX_CONCURRENCY = 50
+API_SEM = asyncio.Semaphore(API_MAX_CONCURRENCY)
+
+# Cap how many pages refresh at once so large account lists don't stampede Chromium
+MAX_CONCURRENCY = max(2, min(8, os.cpu_count() or 1))
+SEM = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Refresh cycles between saves of each account's browser session
+STATE_CHECKPOINT_EVERY = 30
+background_tasks = set()
+# Digest of the session last written to each state file, and a lock serializing its saves
+state_digests = {}
+state_locks = {}
+
+# Set by each node as it reports so the dashboard repaints only when something changed
+update_event = asyncio.Event()
+
+# Points scanner installed once per context and re-run by the browser on every navigation;
+# walks text nodes so no element forces a layout
+POINTS_SCANNER_JS = r"""
+window.__pointsRe = /(\d+)\s*points?/i;
+window.__extractPoints = () => {
+    const w = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    let n;
+    while ((n = w.nextNode())) {
+        const m = window.__pointsRe.exec(n.nodeValue);
+        if (m) return m[1];
+    }
+    return null;
+};
+"""
+EXTRACT_POINTS_JS = "() => window.__extractPoints()"
+POINTS_RE = re.compile(r"\d+")
+
+# Resource types the points scan never needs
+BLOCKED_RESOURCES = {"image", "font", "media", "stylesheet"}
+
+# Stream accounts from CSV; uses an email,password header when present, else the first two columns
+def iter_accounts(filename="accounts.csv"):
     with open(filename, newline="") as csvfile:
         reader = csv.reader(csvfile)
-        for row in reader:
-            if len(row) >= 2:
-                email, password = row[0].strip(), row[1].strip()
-                accounts.append({"email": email, "password": password})
-    return accounts
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [field.strip().lower() for field in header]
+        if "email" in fields and "password" in fields:
+            email_col, password_col = fields.index("email"), fields.index("password")
+            rows = reader
+        else:
+            email_col, password_col = 0, 1
+            rows = itertools.chain([header], reader)
+        for row in rows:
+            if len(row) > max(email_col, password_col):
+                email, password = row[email_col].strip(), row[password_col].strip()
+                if email:
+                    yield {"email": email, "password": password}
+
+# Load accounts from CSV
+def load_accounts(filename="accounts.csv"):
+    return list(iter_accounts(filename))
 
 # Load proxies from TXT
 def load_proxies(filename="proxies.txt"):
-    proxies = []
     try:
-        with open(filename) as f:
-            proxies = [line.strip() for line in f if line.strip()]
+        lines = Path(filename).read_text("utf-8").splitlines()
     except FileNotFoundError:
-        pass
-    return proxies
+        return []
+    return [line.strip() for line in lines if line.strip()]
 
-# Fetch points for a single account
-async def fetch_points(account, proxy=None):
-    try:
-        launch_args = {
-            "headless": True,
-            "args": ["--no-sandbox"]
-        }
-        if proxy:
-            launch_args["args"].append(f"--proxy-server={proxy}")
-        
-        browser = await launch(**launch_args)
-        page = await browser.newPage()
-        await page.goto("https://app.hednet.io/dashboard", {"timeout": 30000})
-        
-        # Example: Extract points from element (update selector as needed)
-        points = 0
+# Abort requests for assets the dashboard scrape doesn't use
+async def block_assets(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Proxy entries may omit the scheme; treat those as HTTP proxies
+def proxy_url(proxy):
+    return proxy if "://" in proxy else f"http://{proxy}"
+
+# Split a proxy URL into Playwright's proxy settings; accounts often share proxies
+@lru_cache(maxsize=None)
+def parse_proxy(proxy):
+    parsed = urlparse(proxy_url(proxy))
+    settings = {
+        # netloc keeps IPv6 brackets that hostname strips
+        "server": f"{parsed.scheme}://{parsed.netloc.rpartition('@')[2]}",
+        "username": unquote(parsed.username) if parsed.username else None,
+        "password": unquote(parsed.password) if parsed.password else None,
+    }
+    return {key: value for key, value in settings.items() if value}
+
+# Saved browser session for an account
+def state_path(account):
+    return Path(f"storage_state_{account['email'].replace('@', '_')}.json")
+
+# Short fingerprint of a serialized session, used to skip rewriting unchanged state files
+def state_digest(state):
+    return hashlib.blake2b(state.encode("utf-8"), digest_size=16).digest()
+
+# Replace the state file in one step so an interrupted save never leaves it half-written
+def write_state(state_file, state):
+    tmp_file = state_file.with_suffix(".tmp")
+    tmp_file.write_text(state, "utf-8")
+    os.replace(tmp_file, state_file)
+
+# Open the isolated context and persistent page an account keeps across refreshes
+async def open_page(browser, proxy=None, state_file=None):
+    context_args = {}
+    if proxy:
+        context_args["proxy"] = parse_proxy(proxy)
+    context = None
+    if state_file is not None and state_file.exists():
         try:
-            elem = await page.querySelector("selector-for-points")  # TODO: update selector
-            points = int(await page.evaluate('(element) => element.innerText', elem))
-        except Exception:
-            points = 0
+            state = await asyncio.to_thread(state_file.read_text, "utf-8")
+            context = await browser.new_context(storage_state=json.loads(state), **context_args)
+            # Seed the digest so the first checkpoint skips an unchanged session
+            state_digests[state_file] = state_digest(state)
+        except Exception as e:
+            print(f"Ignoring unreadable session {state_file}: {e}", file=sys.stderr)
+    if context is None:
+        context = await browser.new_context(**context_args)
+    context.set_default_timeout(30000)
+    await context.add_init_script(POINTS_SCANNER_JS)
+    await context.route("**/*", block_assets)
+    return await context.new_page()
+
+# Open an account's page; a failure is shown on that account's row instead of stopping the bot
+async def open_node(browser, account, proxy, pages, cells):
+    try:
+        pages[account["email"]] = await open_page(browser, proxy, state_path(account))
+    except Exception as e:
+        cells[account["email"]][1].plain = f"Error: {e}"
+        update_event.set()
+
+# Read the points counter off the dashboard once it renders; polls every 250ms rather than every
+# animation frame, and a page that never shows the counter holds its SEM slot for up to 10s
+async def extract_points(page):
+    handle = await page.wait_for_function(EXTRACT_POINTS_JS, polling=250, timeout=10000)
+    text = await handle.json_value()
+    match = POINTS_RE.search(text or "")
+    return int(match.group()) if match else 0
+
+# Pooled HTTP client per proxy, shared by every account routed through it
+def api_client(proxy=None):
+    client = API_CLIENTS.get(proxy)
+    if client is None:
+        import httpx
         
-        await browser.close()
-        return points, "Active"
+        client = API_CLIENTS[proxy] = httpx.AsyncClient(
+            proxy=proxy_url(proxy) if proxy else None,
+            http2=HAS_H2,
+            # Refuse every Set-Cookie so sessions never mix in the shared per-proxy jar
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONCURRENCY,
+                max_keepalive_connections=API_MAX_CONCURRENCY,
+            ),
+        )
+    return client
+
+async def close_api_clients():
+    for client in API_CLIENTS.values():
+        await client.aclose()
+    API_CLIENTS.clear()
+
+# Cookie header for url built from a saved session, matching cookies the way the browser would
+def cookie_header(cookies, url):
+    parsed = urlparse(url)
+    host, path = parsed.hostname or "", parsed.path or "/"
+    now = time.time()
+    pairs = []
+    for cookie in cookies:
+        domain = cookie.get("domain", "").lstrip(".")
+        if host != domain and not host.endswith(f".{domain}"):
+            continue
+        if not path.startswith(cookie.get("path", "/")):
+            continue
+        if cookie.get("secure") and parsed.scheme != "https":
+            continue
+        if 0 < cookie.get("expires", -1) < now:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+# Read the API cookies straight from an account's saved session, no browser needed
+def load_api_cookies(state_file):
+    if not state_file.exists():
+        return ""
+    try:
+        state = json.loads(state_file.read_text("utf-8"))
+        return cookie_header(state.get("cookies", []), POINTS_API_URL)
     except Exception as e:
-        return 0, f"Error: {e}"
+        print(f"Ignoring unreadable session {state_file}: {e}", file=sys.stderr)
+        return ""
+
+# Fetch points from the JSON API, authenticated with the account's saved session cookies
+async def fetch_points_api(cookies, proxy=None):
+    async with API_SEM:
+        try:
+            response = await api_client(proxy).get(POINTS_API_URL, headers={"Cookie": cookies})
+            response.raise_for_status()
+            return int(response.json()["points"]), "Active"
+        except Exception as e:
+            return None, f"Error: {e}"
 
-# Display dashboard
-async def display_dashboard(accounts, proxies=None):
+# Fetch points for a single account; points is None when no fresh value could be read
+async def fetch_points(page, timeout_error):
+    async with SEM:
+        try:
+            await page.goto("https://app.hednet.io/dashboard", wait_until="domcontentloaded")
+            
+            try:
+                points = await extract_points(page)
+            except timeout_error:
+                return None, "No points"
+            
+            return points, "Active"
+        except Exception as e:
+            return None, f"Error: {e}"
+
+# Save an account's browser session so the next run can restore it; unchanged sessions are skipped
+async def save_state(page, state_file):
+    async with state_locks.setdefault(state_file, asyncio.Lock()):
+        try:
+            state = json.dumps(await page.context.storage_state())
+            digest = state_digest(state)
+            if state_digests.get(state_file) == digest:
+                return
+            await asyncio.to_thread(write_state, state_file, state)
+            state_digests[state_file] = digest
+        except Exception as e:
+            print(f"Failed to save session {state_file}: {e}", file=sys.stderr)
+
+# Write every account's session in the background so refreshes aren't held up
+def checkpoint_states(accounts, pages):
+    for account in accounts:
+        page = pages.get(account["email"])
+        if page is None:
+            continue
+        task = asyncio.create_task(save_state(page, state_path(account)))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+# Wall-clock HH:MM:SS for the "Last Updated" column
+def timestamp():
+    now = time.localtime()
+    return f"{now.tm_hour:02d}:{now.tm_min:02d}:{now.tm_sec:02d}"
+
+# Build the dashboard table once; each account keeps mutable cells for its results
+def make_table(accounts, account_proxies):
+    from rich import box
+    from rich.table import Table
+    from rich.text import Text
+    
     table = Table(title="Hednet Multi-node Dashboard", box=box.DOUBLE_EDGE)
     table.add_column("Email", style="cyan")
     table.add_column("Proxy", style="magenta")
@@ -65,28 +287,112 @@ async def display_dashboard(accounts, proxies=None):
     table.add_column("Status", style="yellow")
     table.add_column("Last Updated", style="blue")
     
-    tasks = []
-    for i, account in enumerate(accounts):
-        proxy = proxies[i] if proxies and i < len(proxies) else None
-        tasks.append(fetch_points(account, proxy))
+    cells = {}
+    for account, proxy in zip(accounts, account_proxies):
+        row = (Text("0"), Text("Pending"), Text("-"))
+        table.add_row(account["email"], proxy or "-", *row)
+        cells[account["email"]] = row
+    
+    return table, cells
+
+# Repaint the dashboard whenever a node reports in
+async def render_dashboard(table):
+    from rich.live import Live
     
-    results = await asyncio.gather(*tasks)
+    with Live(table, auto_refresh=False, screen=False) as live:
+        while True:
+            await update_event.wait()
+            update_event.clear()
+            live.refresh()
+
+# Refresh a single account and publish its result
+async def node_worker(account, fetch, cells):
+    points, status = await fetch()
+    points_cell, status_cell, updated_cell = cells[account["email"]]
+    if points is not None:
+        points_cell.plain = str(points)
+    status_cell.plain = status
+    updated_cell.plain = timestamp()
+    update_event.set()
+
+# Refresh every account once; nodes maps each usable account's email to its fetch coroutine
+async def display_dashboard(accounts, nodes, cells):
+    tasks = [
+        node_worker(account, nodes[account["email"]], cells)
+        for account in accounts
+        if account["email"] in nodes
+    ]
     
-    for account, (points, status) in zip(accounts, results):
-        proxy = proxies[accounts.index(account)] if proxies and accounts.index(account) < len(proxies) else "-"
-        table.add_row(account["email"], proxy or "-", str(points), status, datetime.now().strftime("%H:%M:%S"))
+    await asyncio.gather(*tasks)
+
+# Refresh forever, running checkpoint (if any) every STATE_CHECKPOINT_EVERY cycles
+async def refresh_forever(accounts, nodes, cells, checkpoint=None):
+    cycle = 0
+    while True:
+        await display_dashboard(accounts, nodes, cells)
+        cycle += 1
+        if checkpoint is not None and cycle % STATE_CHECKPOINT_EVERY == 0:
+            checkpoint()
+        await asyncio.sleep(10)  # refresh every 10 seconds
+
+# Scrape every account from one browser; each account gets its own context and page
+async def run_browser_nodes(accounts, account_proxies, cells):
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
     
-    console.clear()
-    console.print(table)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=["--no-sandbox"])
+        try:
+            pages = {}
+            try:
+                await asyncio.gather(*(
+                    open_node(browser, account, proxy, pages, cells)
+                    for account, proxy in zip(accounts, account_proxies)
+                ))
+                nodes = {email: partial(fetch_points, page, PlaywrightTimeoutError) for email, page in pages.items()}
+                await refresh_forever(accounts, nodes, cells, partial(checkpoint_states, accounts, pages))
+            finally:
+                # Let periodic saves finish, then save sessions one last time before the browser goes away
+                await asyncio.gather(*background_tasks)
+                checkpoint_states(accounts, pages)
+                await asyncio.gather(*background_tasks)
+        finally:
+            await browser.close()
+
+# Poll the JSON API for every account using cookies from their saved sessions
+async def run_api_nodes(accounts, account_proxies, cells):
+    cookie_headers = await asyncio.gather(*(
+        asyncio.to_thread(load_api_cookies, state_path(account)) for account in accounts
+    ))
+    nodes = {
+        account["email"]: partial(fetch_points_api, cookies, proxy)
+        for account, proxy, cookies in zip(accounts, account_proxies, cookie_headers)
+    }
+    try:
+        await refresh_forever(accounts, nodes, cells)
+    finally:
+        await close_api_clients()
 
 # Main loop
 async def main():
-    accounts = load_accounts()
-    proxies = load_proxies()
+    if POINTS_API_URL and not HAS_HTTPX:
+        print("HEDNET_POINTS_API is set but httpx is not installed; scraping the dashboard instead", file=sys.stderr)
     
-    while True:
-        await display_dashboard(accounts, proxies)
-        await asyncio.sleep(10)  # refresh every 10 seconds
+    accounts, proxies = await asyncio.gather(
+        asyncio.to_thread(load_accounts),
+        asyncio.to_thread(load_proxies),
+    )
+    # Pair every account with its proxy once instead of looking it up per row
+    account_proxies = [proxies[i] if i < len(proxies) else None for i in range(len(accounts))]
+    
+    table, cells = make_table(accounts, account_proxies)
+    render_task = asyncio.create_task(render_dashboard(table))
+    try:
+        if USE_API:
+            await run_api_nodes(accounts, account_proxies, cells)
+        else:
+            await run_browser_nodes(accounts, account_proxies, cells)
+    finally:
+        render_task.cancel()
 
 if __name__ == "__main__":
     asyncio.run(main())